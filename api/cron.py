@@ -1,17 +1,25 @@
 from http.server import BaseHTTPRequestHandler
-import subprocess
+import contextlib
+import io
+import os
+import sys
+
+# Import the pipeline once per process instead of spawning a fresh interpreter per request
+sys.path.insert(0, '/var/task/app')
+from _0overall import main
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         try:
-            result = subprocess.run(['python3', 'app/_0overall.py'], 
-                                  capture_output=True, text=True, cwd='/var/task')
-            
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+
             self.send_response(200)
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
-            self.wfile.write(f'Success: {result.stdout}'.encode())
+            self.wfile.write(f'Success: {output.getvalue()}'.encode())
         except Exception as e:
             self.send_response(500)
             self.end_headers()
-            self.wfile.write(f'Error: {str(e)}'.encode())
\ No newline at end of file
+            self.wfile.write(f'Error: {str(e)}'.encode())
@@ -13,6 +13,14 @@ from _3classifierssummarizer import AspectClassifier
 from _4supabase import SupabaseUploader
 
 
+def has_work(temp_db, stage):
+    """Return True if any articles are waiting at the given stage"""
+    count = temp_db.count_by_stage(stage)
+    if count == 0:
+        logging.info(f"No articles at stage '{stage}', skipping")
+    return count > 0
+
+
 def main(supabase_url, supabase_key):
     logging.basicConfig(level=logging.INFO)
     
@@ -25,30 +33,37 @@ def main(supabase_url, supabase_key):
         fetcher = ArticleRequester(temp_db)
         fetcher.fetch_all_sources()
         
+        # Steps 2-6 each run only if the previous stage left rows to work on
         # Step 2: Title classification
         logging.info("=== Step 2: Title Classification ===")
-        title_classifier = TitleClassifier(temp_db)
-        title_classifier.process()
+        if has_work(temp_db, 'scraped'):
+            title_classifier = TitleClassifier(temp_db)
+            title_classifier.process()
         
         # Step 3: Content filtering
         logging.info("=== Step 3: Content Filtering ===")
-        content_filter = ContentFilter(temp_db)
-        content_filter.process()
+        if has_work(temp_db, 'title_filtered'):
+            content_filter = ContentFilter(temp_db)
+            content_filter.process()
         
         # Step 4: Summarization
         logging.info("=== Step 4: Summarization ===")
-        summarizer = Summarizer(temp_db)
-        summarizer.process()
+        if has_work(temp_db, 'content_filtered'):
+            summarizer = Summarizer(temp_db)
+            summarizer.process()
         
         # Step 5: Aspect classification
         logging.info("=== Step 5: Aspect Classification ===")
-        aspect_classifier = AspectClassifier(temp_db)
-        aspect_classifier.process()
+        if has_work(temp_db, 'summarized'):
+            aspect_classifier = AspectClassifier(temp_db)
+            aspect_classifier.process()
 
         # Step 6: Upload to Supabase
         logging.info("=== Step 6: Uploading to Supabase ===")
-        uploader = SupabaseUploader(supabase_url, supabase_key, temp_db)
-        uploaded, skipped = uploader.upload_final_articles()
+        uploaded = 0
+        if has_work(temp_db, 'classified'):
+            uploader = SupabaseUploader(supabase_url, supabase_key, temp_db)
+            uploaded, skipped = uploader.upload_final_articles()
         
         logging.info(f"Pipeline complete! {uploaded} new articles added to production")
         
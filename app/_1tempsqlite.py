@@ -1,16 +1,66 @@
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
 
+import zstandard
+
+
+# The DB is disposable (deleted in cleanup), so durability is traded for speed
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=OFF',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Columns callers may request from get_articles_by_stage
+ARTICLE_COLUMNS = frozenset({
+    'id', 'url', 'title', 'text_zstd', 'text_len', 'sector', 'source', 'published_at',
+    'prediction', 'score', 'gpt3_filter_answer', 'gpt3_summary', 'gpt3_aspect',
+    'processing_stage', 'created_at',
+})
+
+# One fixed statement per stage transition so sqlite3 reuses the prepared statement
+UPDATE_TITLE_SQL = "UPDATE articles SET prediction = ?, score = ?, processing_stage = 'title_filtered' WHERE id = ?"
+UPDATE_FILTER_SQL = "UPDATE articles SET gpt3_filter_answer = ?, processing_stage = 'content_filtered' WHERE id = ?"
+UPDATE_SUMMARY_SQL = "UPDATE articles SET gpt3_summary = ?, processing_stage = 'summarized' WHERE id = ?"
+UPDATE_ASPECT_SQL = "UPDATE articles SET gpt3_aspect = ?, processing_stage = 'classified' WHERE id = ?"
+UPDATE_REJECTED_SQL = "UPDATE articles SET processing_stage = 'rejected' WHERE id = ?"
+
+
+def pack_text(compressor, text):
+    """Return (text_zstd, text_len) column values for an article body"""
+    text = text or ''
+    return compressor.compress(text.encode('utf-8')), len(text)
+
+
+def get_text(row):
+    """Decompress the article body from a row that selected text_zstd"""
+    if row['text_zstd'] is None:
+        return ''
+    return zstandard.ZstdDecompressor().decompress(row['text_zstd']).decode('utf-8')
+
 
 class TempArticleDB:
     def __init__(self, db_path='temp_processing.db'):
         self.db_path = db_path
+        # One long-lived connection shared by the fetcher threads; the lock
+        # serializes access so only one thread uses it at a time
+        self._lock = threading.RLock()
+        self._conn = None
         self.init_db()
     
     def init_db(self):
         """Initialize temporary SQLite database with all processing fields"""
-        conn = sqlite3.connect(self.db_path)
+        # Autocommit mode; multi-statement writes go through transaction()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        self._conn = conn
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -18,7 +68,8 @@ class TempArticleDB:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 url TEXT UNIQUE NOT NULL,
                 title TEXT NOT NULL,
-                text TEXT,
+                text_zstd BLOB,      -- zstd-compressed article body, see get_text()
+                text_len INTEGER,    -- character length of the uncompressed body
                 sector TEXT,
                 source TEXT,
                 published_at TEXT,
@@ -35,21 +86,13 @@ class TempArticleDB:
             )
         ''')
         
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_url ON articles(url)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_stage ON articles(processing_stage)')
-        
-        conn.commit()
-        conn.close()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Context manager granting exclusive use of the shared connection"""
+        with self._lock:
+            yield self._conn
     
     def article_exists(self, url):
         """Check if article already exists"""
@@ -58,58 +101,147 @@ class TempArticleDB:
             cursor.execute('SELECT 1 FROM articles WHERE url = ?', (url,))
             return cursor.fetchone() is not None
     
+    def load_url_set(self):
+        """Return the set of all article URLs currently stored"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT url FROM articles')
+            return {row['url'] for row in cursor.fetchall()}
+    
     def insert_article(self, article_data):
         """Insert new article into temp database"""
+        text_zstd, text_len = pack_text(zstandard.ZstdCompressor(level=3), article_data['text'])
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO articles (url, title, text, sector, source, published_at, processing_stage)
-                VALUES (?, ?, ?, ?, ?, ?, 'scraped')
+                INSERT INTO articles (url, title, text_zstd, text_len, sector, source, published_at, processing_stage)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'scraped')
             ''', (
                 article_data['url'],
                 article_data['title'],
-                article_data['text'],
+                text_zstd,
+                text_len,
                 article_data['sector'],
                 article_data['source'],
                 article_data.get('published_at', '')
             ))
-            conn.commit()
     
-    def get_articles_by_stage(self, stage, limit=None):
-        """Get articles at a specific processing stage"""
+    @contextmanager
+    def transaction(self):
+        """Context manager yielding a cursor inside a single BEGIN IMMEDIATE ... COMMIT"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            query = 'SELECT * FROM articles WHERE processing_stage = ?'
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+    
+    def insert_articles_bulk(self, articles):
+        """Insert many articles in one transaction, ignoring URLs already stored.
+        Returns the number of rows actually inserted."""
+        if not articles:
+            return 0
+        # Compress outside the lock; compressors are not shared across threads
+        compressor = zstandard.ZstdCompressor(level=3)
+        rows = [(
+            article_data['url'],
+            article_data['title'],
+            *pack_text(compressor, article_data['text']),
+            article_data['sector'],
+            article_data['source'],
+            article_data.get('published_at', '')
+        ) for article_data in articles]
+        with self.transaction() as cursor:
+            cursor.executemany('''
+                INSERT OR IGNORE INTO articles (url, title, text_zstd, text_len, sector, source, published_at, processing_stage)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'scraped')
+            ''', rows)
+            return cursor.rowcount
+    
+    def get_articles_by_stage(self, stage, limit=None, columns=None, where=None):
+        """Get articles at a specific processing stage.
+        columns narrows the SELECT list; where adds extra SQL predicates"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if columns:
+                unknown = set(columns) - ARTICLE_COLUMNS
+                if unknown:
+                    raise ValueError(f"Unknown article columns: {sorted(unknown)}")
+            select_list = ', '.join(columns) if columns else '*'
+            query = f'SELECT {select_list} FROM articles WHERE processing_stage = ?'
+            if where:
+                query += f' AND ({where})'
+            params = (stage,)
             if limit:
-                query += f' LIMIT {limit}'
-            cursor.execute(query, (stage,))
+                query += ' LIMIT ?'
+                params = (stage, limit)
+            cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
-    def update_article(self, article_id, updates):
-        """Update article fields"""
+    def count_by_stage(self, stage):
+        """Count articles at a specific processing stage"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            set_clause = ', '.join([f'{k} = ?' for k in updates.keys()])
-            values = list(updates.values()) + [article_id]
-            cursor.execute(f'UPDATE articles SET {set_clause} WHERE id = ?', values)
-            conn.commit()
+            cursor.execute('SELECT COUNT(*) FROM articles WHERE processing_stage = ?', (stage,))
+            return cursor.fetchone()[0]
+    
+    def _update_bulk(self, sql, rows):
+        """Run one of the fixed UPDATE statements over many rows in one transaction"""
+        if not rows:
+            return
+        with self.transaction() as cursor:
+            cursor.executemany(sql, rows)
+    
+    def update_title_predictions(self, rows):
+        """rows: (prediction, score, article_id) tuples"""
+        self._update_bulk(UPDATE_TITLE_SQL, rows)
+    
+    def update_filter_answers(self, rows):
+        """rows: (gpt3_filter_answer, article_id) tuples"""
+        self._update_bulk(UPDATE_FILTER_SQL, rows)
+    
+    def update_summaries(self, rows):
+        """rows: (gpt3_summary, article_id) tuples"""
+        self._update_bulk(UPDATE_SUMMARY_SQL, rows)
+    
+    def update_aspects(self, rows):
+        """rows: (gpt3_aspect, article_id) tuples"""
+        self._update_bulk(UPDATE_ASPECT_SQL, rows)
+    
+    def mark_rejected(self, rows):
+        """rows: (article_id,) tuples"""
+        self._update_bulk(UPDATE_REJECTED_SQL, rows)
     
     def get_final_articles(self):
         """Get all fully processed articles ready for Supabase"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT url, title, text, sector, source, published_at, gpt3_summary, gpt3_aspect
+                SELECT url, title, text_zstd, sector, source, published_at, gpt3_summary, gpt3_aspect
                 FROM articles 
                 WHERE processing_stage = 'classified'
                 AND gpt3_summary IS NOT NULL
                 AND gpt3_summary != ''
-                AND gpt3_summary NOT LIKE '%NO_CONSEQUENCE%'
             ''')
-            return [dict(row) for row in cursor.fetchall()]
+            articles = []
+            for row in cursor.fetchall():
+                article = dict(row)
+                article['text'] = get_text(article)
+                del article['text_zstd']
+                articles.append(article)
+            return articles
     
     def cleanup(self):
         """Delete the temporary database file"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
         if os.path.exists(self.db_path):
             os.remove(self.db_path)
             print(f"Deleted temporary database: {self.db_path}")
\ No newline at end of file
@@ -4,24 +4,55 @@ sys.dont_write_bytecode = True
 from datetime import datetime, timedelta
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from newspaper import Article
 import logging
 from _1tempsqlite import TempArticleDB
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import feedparser
 import os
 from dotenv import load_dotenv
 
 
 class ArticleRequester:
+    # Search queries; also the sectors the classifier prompts are specialized for
+    queries = ['social media', 'voice assistants', 'virtual reality', 
+               'computer vision', 'robotics', 'mobile technology',
+               'ai decision-making', 'neuroscience', 'computational biology',
+               'ubiquitous computing']
+
     def __init__(self, temp_db: TempArticleDB):
         self.temp_db = temp_db
+        # URLs already stored or buffered; INSERT OR IGNORE backs this up under races
+        self.seen = temp_db.load_url_set()
+        # Shared keep-alive session for API calls and article downloads; retries
+        # 429/5xx with backoff and hands the final response back to raise_for_status
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.current_date = datetime.now()
         self.seven_days_ago = self.current_date - timedelta(days=7)
-        self.queries = ['social media', 'voice assistants', 'virtual reality', 
-                        'computer vision', 'robotics', 'mobile technology',
-                        'ai decision-making', 'neuroscience', 'computational biology',
-                        'ubiquitous computing']
+        # Max concurrent in-flight tasks per source (NYT allows 5 req/min, arXiv 1 req/3 s,
+        # Guardian 1 req/s per developer key via the sleep held under the slot)
+        self.source_limits = {
+            'arxiv': threading.Semaphore(1),
+            'guardian': threading.Semaphore(1),
+            'nyt': threading.Semaphore(1),
+            '404media': threading.Semaphore(1),
+        }
         
     def get_article(self, article):
         """Download and parse article"""
@@ -41,6 +72,20 @@ class ArticleRequester:
             logging.error(f"Error fetching article: {e}")
             return None
     
+    def download_text(self, url):
+        """Download a page through the pooled session and parse its body text.
+        Returns None if the download or parse fails"""
+        try:
+            response = self.session.get(url, timeout=15)
+            response.raise_for_status()
+            article = Article(url)
+            article.download(input_html=response.text)
+            article.parse()
+            return article.text
+        except Exception as e:
+            logging.warning(f"Failed to download article {url}: {e}")
+            return None
+    
     def fetch_from_arxiv(self, keyword: str, max_results: int = 100):
         """
         Fetch articles from arXiv API
@@ -71,10 +116,12 @@ class ArticleRequester:
             from urllib.parse import urlencode
             query_url = f"{base_url}?{urlencode(params)}"
             
-            # Parse the Atom feed response
-            feed = feedparser.parse(query_url)
+            # Fetch through the shared session, then parse the Atom feed bytes
+            response = self.session.get(query_url, timeout=15)
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
             
-            articles_added = 0
+            pending = []
             for entry in feed.entries:
                 # Parse submission date
                 published_date = datetime.strptime(entry.published, '%Y-%m-%dT%H:%M:%SZ')
@@ -88,7 +135,7 @@ class ArticleRequester:
                 arxiv_url = f'https://arxiv.org/abs/{arxiv_id}'
                 
                 # Check if already exists
-                if self.temp_db.article_exists(arxiv_url):
+                if arxiv_url in self.seen:
                     continue
                 
                 # Extract abstract (arXiv's "text" content)
@@ -106,11 +153,12 @@ class ArticleRequester:
                     'published_at': published_date.strftime('%Y-%m-%d')
                 }
                 
-                self.temp_db.insert_article(article_data)
-                articles_added += 1
+                pending.append(article_data)
+                self.seen.add(arxiv_url)
             
+            articles_added = self.temp_db.insert_articles_bulk(pending)
             logging.info(f"Added {articles_added} articles from arXiv for '{keyword}'")
-            time.sleep(3)  # Be respectful to arXiv API
+            time.sleep(3)  # arXiv API terms: one request every 3 s; runs while holding the arXiv slot
             return articles_added
             
         except Exception as e:
@@ -143,7 +191,7 @@ class ArticleRequester:
         }
         
         try:
-            response = requests.get(base_url, params=params)
+            response = self.session.get(base_url, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
             
@@ -151,10 +199,10 @@ class ArticleRequester:
                 logging.error(f"Guardian API error: {data['response']['status']}")
                 return 0
             
-            articles_added = 0
+            pending = []
             for item in data['response']['results']:
                 # Check if already exists
-                if self.temp_db.article_exists(item['webUrl']):
+                if item['webUrl'] in self.seen:
                     continue
                 
                 # Get full article body if available, otherwise use trail text
@@ -175,9 +223,10 @@ class ArticleRequester:
                     'published_at': item['webPublicationDate'][:10]  # Format: YYYY-MM-DD
                 }
                 
-                self.temp_db.insert_article(article_data)
-                articles_added += 1
+                pending.append(article_data)
+                self.seen.add(item['webUrl'])
             
+            articles_added = self.temp_db.insert_articles_bulk(pending)
             logging.info(f"Added {articles_added} articles from The Guardian for '{keyword}'")
             time.sleep(1)  # Rate limiting
             return articles_added
@@ -203,7 +252,8 @@ class ArticleRequester:
         from_date = self.seven_days_ago.strftime('%Y%m%d')
         to_date = self.current_date.strftime('%Y%m%d')
         
-        articles_added = 0
+        candidates = []
+        candidate_urls = set()
         
         # NYT API paginates with pages of 10 articles
         for page in range(page_limit):
@@ -218,7 +268,7 @@ class ArticleRequester:
             }
             
             try:
-                response = requests.get(base_url, params=params)
+                response = self.session.get(base_url, params=params, timeout=15)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -235,42 +285,11 @@ class ArticleRequester:
                     article_url = item['web_url']
                     
                     # Check if already exists
-                    if self.temp_db.article_exists(article_url):
-                        continue
-                    
-                    # Try to get full article text using newspaper library
-                    try:
-                        article = Article(article_url)
-                        article.download()
-                        article.parse()
-                        article_text = article.text
-                    except:
-                        # Fallback to lead paragraph and snippet
-                        article_text = item.get('lead_paragraph', '')
-                        if item.get('snippet'):
-                            article_text = item['snippet'] + '\n\n' + article_text
-                    
-                    # Skip if no substantial text
-                    if len(article_text) < 100:
+                    if article_url in self.seen or article_url in candidate_urls:
                         continue
                     
-                    # Parse publication date
-                    pub_date = datetime.strptime(
-                        item['pub_date'], 
-                        '%Y-%m-%dT%H:%M:%S%z'
-                    ).strftime('%Y-%m-%d')
-                    
-                    article_data = {
-                        'title': item['headline']['main'],
-                        'text': article_text,
-                        'source': 'New York Times',
-                        'url': article_url,
-                        'sector': keyword,
-                        'published_at': pub_date
-                    }
-                    
-                    self.temp_db.insert_article(article_data)
-                    articles_added += 1
+                    candidates.append((item, article_url))
+                    candidate_urls.add(article_url)
                 
                 # NYT rate limit: 5 requests per minute
                 time.sleep(12)  # Wait 12 seconds between requests
@@ -285,6 +304,44 @@ class ArticleRequester:
                 logging.error(f"Unexpected error with NYT API: {e}")
                 break
         
+        # Try to get full article text using newspaper library, downloading in parallel
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            texts = list(executor.map(self.download_text, [url for _, url in candidates]))
+        
+        pending = []
+        for (item, article_url), article_text in zip(candidates, texts):
+            try:
+                if article_text is None:
+                    # Fallback to lead paragraph and snippet
+                    article_text = item.get('lead_paragraph', '')
+                    if item.get('snippet'):
+                        article_text = item['snippet'] + '\n\n' + article_text
+                
+                # Skip if no substantial text
+                if len(article_text) < 100:
+                    continue
+                
+                # Parse publication date
+                pub_date = datetime.strptime(
+                    item['pub_date'], 
+                    '%Y-%m-%dT%H:%M:%S%z'
+                ).strftime('%Y-%m-%d')
+                
+                article_data = {
+                    'title': item['headline']['main'],
+                    'text': article_text,
+                    'source': 'New York Times',
+                    'url': article_url,
+                    'sector': keyword,
+                    'published_at': pub_date
+                }
+                
+                pending.append(article_data)
+                self.seen.add(article_url)
+            except Exception as e:
+                logging.error(f"Unexpected error with NYT article {article_url}: {e}")
+        
+        articles_added = self.temp_db.insert_articles_bulk(pending)
         logging.info(f"Added {articles_added} articles from NYT for '{keyword}'")
         return articles_added
     
@@ -295,10 +352,12 @@ class ArticleRequester:
         logging.info("Fetching articles from 404 Media RSS")
 
         feed_url = "https://www.404media.co/rss/"
-        articles_added = 0
+        pending = []
 
         try:
-            feed = feedparser.parse(feed_url)
+            response = self.session.get(feed_url, timeout=15)
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
 
             for entry in feed.entries:
                 # Parse publication date (RSS uses struct_time)
@@ -314,7 +373,7 @@ class ArticleRequester:
                 article_url = entry.link
 
                 # Deduplication
-                if self.temp_db.article_exists(article_url):
+                if article_url in self.seen:
                     continue
 
                 # Fetch full article text
@@ -340,9 +399,10 @@ class ArticleRequester:
                     'published_at': published_date.strftime('%Y-%m-%d')
                 }
 
-                self.temp_db.insert_article(article_data)
-                articles_added += 1
+                pending.append(article_data)
+                self.seen.add(article_url)
 
+            articles_added = self.temp_db.insert_articles_bulk(pending)
             logging.info(f"Added {articles_added} articles from 404 Media")
             time.sleep(1)  # polite RSS polling
             return articles_added
@@ -352,6 +412,11 @@ class ArticleRequester:
             return 0
 
     
+    def _run_limited(self, source, fn, *args, **kwargs):
+        """Run a fetch task while holding its source's rate-limit slot"""
+        with self.source_limits[source]:
+            return fn(*args, **kwargs)
+
     def fetch_all_sources(self):
         """
         Fetch articles from all sources (NewsAPI, arXiv, Guardian, NYT)
@@ -360,38 +425,35 @@ class ArticleRequester:
         
         total_added = 0
 
-            
-        for query in self.queries:
-            logging.info(f"\n=== Processing query: {query} ===")
-            # arXiv
-            logging.info("Fetching from arXiv...")
-            tot_arxiv = self.fetch_from_arxiv(query, max_results=50)
-            total_added += tot_arxiv
-            logging.info(f"total found from arxiv: {tot_arxiv}")
-            
-            # The Guardian
-            logging.info("Fetching from The Guardian...")
+        guardian_api_key = os.getenv("GUARDIAN_API_KEY")
+        nyt_api_key = os.getenv("NYT_API_KEY")
 
-            guardian_api_key = os.getenv("GUARDIAN_API_KEY")
-            tot_guardian = self.fetch_from_guardian(guardian_api_key, query, page_size=50)
-            total_added += tot_guardian
-            logging.info(f"total found from The Guardian: {tot_guardian}")
-            
-            # New York Times
-            logging.info("Fetching from New York Times...")
+        # One task per (query, source); sources run concurrently, and each
+        # source's semaphore keeps its own rate-limit sleeps serialized
+        tasks = []
+        for query in self.queries:
+            tasks.append(('arxiv', query, self.fetch_from_arxiv, (query,), {'max_results': 50}))
+            tasks.append(('guardian', query, self.fetch_from_guardian, (guardian_api_key, query), {'page_size': 50}))
+            tasks.append(('nyt', query, self.fetch_from_nyt, (nyt_api_key, query), {'page_limit': 5}))
+        tasks.append(('404media', None, self.fetch_from_404media, (), {}))
 
-            nyt_api_key = os.getenv("NYT_API_KEY")
-            tot_nyt = self.fetch_from_nyt(nyt_api_key, query, page_limit=5)
-            total_added += tot_nyt
-            logging.info(f"total found from the NYT: {tot_nyt}")
-            
-            logging.info(f"Completed query: {query}")
-        
-        # 404 Media
-        logging.info("Fetching from 404 Media...")
-        tot_404 = self.fetch_from_404media()
-        total_added += tot_404
-        logging.info(f"total found from 404 Media: {tot_404}")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {
+                executor.submit(self._run_limited, source, fn, *args, **kwargs): (source, query)
+                for source, query, fn, args, kwargs in tasks
+            }
+            for future in as_completed(futures):
+                source, query = futures[future]
+                try:
+                    added = future.result()
+                except Exception as e:
+                    logging.error(f"Error fetching from {source} for '{query}': {e}")
+                    continue
+                total_added += added
+                if query is None:
+                    logging.info(f"total found from {source}: {added}")
+                else:
+                    logging.info(f"total found from {source} for '{query}': {added}")
 
         logging.info(f"\n=== Total articles added across all sources: {total_added} ===")
         return total_added
\ No newline at end of file
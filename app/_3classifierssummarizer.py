@@ -3,17 +3,32 @@ sys.dont_write_bytecode = True
 
 import logging
 from tqdm import tqdm
-from _1tempsqlite import TempArticleDB
+from _1tempsqlite import TempArticleDB, get_text
+from _2websitescraper import ArticleRequester
 from helper import llmRequester
 
+# Buffered stage updates are written to SQLite in one transaction per this many rows
+UPDATE_FLUSH_SIZE = 100
+
+class SectorPrompts(dict):
+    """Prompt template with <domain> filled in, cached per sector"""
+    def __init__(self, template):
+        super().__init__((q, template.replace("<domain>", q)) for q in ArticleRequester.queries)
+        self.template = template
+    
+    def __missing__(self, sector):
+        # Sectors outside the query list (e.g. 404 Media's 'technology') are filled on first use
+        self[sector] = self.template.replace("<domain>", sector)
+        return self[sector]
+
 class TitleClassifier:
+    BATCH_SIZE = 32
+
     def __init__(self, temp_db: TempArticleDB):
         self.temp_db = temp_db
         self.llm = llmRequester()
     
-    def evaluate(self, title_text: str):
-        # Classify article title, determine if undesireable consequences is the topic of the paper/article
-        domains = "social media, voice assistants, virtual reality, computer vision, robotics, mobile technology, ai decision-making, neuroscience, computational biology, ubiquitous computing"
+    def get_response_format(self):
         schema = {
             "name": "title_classification",
             "schema": {
@@ -26,62 +41,102 @@ class TitleClassifier:
                 "required": ["label", "score"],
             },
         }
-
-        messages = [
+        return {"type": "json_schema", "json_schema": schema}
+    
+    def get_messages(self, title_text: str):
+        # Classify article title, determine if undesireable consequences is the topic of the paper/article
+        domains = ", ".join(ArticleRequester.queries)
+        return [
             {"role": "system", "content": "Binary classifier for article titles about undesirable consequences of technology."},
             {"role": "user", "content": f"""Title: {title_text}
             Return LABEL_1_relevant only if the title clearly signals the discussion of unintended or undesirable consequences of techology on society. 
              Otherwise LABEL_0_irrelevant. Example technologies include {domains}"""}
         ]
-
-        out = self.llm.chat(messages=messages, response_format={"type": "json_schema", "json_schema": schema})
+    
+    def evaluate(self, title_text: str):
+        out = self.llm.chat(messages=self.get_messages(title_text), response_format=self.get_response_format())
         return out["label"], out["score"]
     
-    def process(self):
-        """Process all scraped articles"""
-        articles = self.temp_db.get_articles_by_stage('scraped')
+    def process(self, use_batch=False):
+        """Process all scraped articles, optionally through the OpenAI Batch API"""
+        articles = self.temp_db.get_articles_by_stage('scraped', columns=('id', 'title'))
         logging.info(f"Processing {len(articles)} articles with title classifier")
         
-        for article in tqdm(articles):
-            prediction, score = self.evaluate(article['title'])
+        response_format = self.get_response_format()
+        if use_batch:
+            self.process_batch(articles, response_format)
+            return
+        
+        pending = []
+        for start in tqdm(range(0, len(articles), self.BATCH_SIZE)):
+            batch = articles[start:start + self.BATCH_SIZE]
+            outputs = self.llm.chat_batch(
+                [self.get_messages(article['title']) for article in batch],
+                response_format=response_format,
+            )
+            
+            for article, out in zip(batch, outputs):
+                pending.append((out["label"], out["score"], article['id']))
             
-            self.temp_db.update_article(article['id'], {
-                'prediction': prediction,
-                'score': score,
-                'processing_stage': 'title_filtered'
-            })
+            if len(pending) >= UPDATE_FLUSH_SIZE:
+                self.temp_db.update_title_predictions(pending)
+                pending = []
         
+        self.temp_db.update_title_predictions(pending)
         logging.info(f"Title classification complete")
+    
+    def process_batch(self, articles, response_format):
+        """Classify all titles in one Batch API job; failed requests stay 'scraped' for the next run"""
+        outputs = self.llm.run_batch(
+            [self.get_messages(article['title']) for article in articles],
+            response_format=response_format,
+        )
+        
+        # Failed requests and replies missing label/score are skipped rather than losing the batch
+        pending = [
+            (out["label"], out["score"], article['id'])
+            for article, out in zip(articles, outputs)
+            if isinstance(out, dict) and "label" in out and "score" in out
+        ]
+        self.temp_db.update_title_predictions(pending)
+        logging.info(f"Title classification complete ({len(pending)}/{len(articles)} classified)")
 
 
 class ContentFilter:
     def __init__(self, temp_db: TempArticleDB):
         self.temp_db = temp_db
         self.llm = llmRequester()  # Your LLM helper
+        self.prompts = SectorPrompts(self.get_filter_prompt())
     
     def get_filter_prompt(self):
         return "Does the article discuss unintended or undesirable consequences of <domain> on society? Answer only Yes or No.\n\n\"{text}\""
     
-    def process(self):
-        """Filter articles by content"""
-        articles = self.temp_db.get_articles_by_stage('title_filtered')
-        # Only process relevant articles
-        articles = [a for a in articles if a['prediction'] == 'LABEL_1_relevant']
+    def process(self, use_batch=False):
+        """Filter articles by content, optionally through the OpenAI Batch API"""
+        # Only process relevant articles short enough for the prompt
+        articles = self.temp_db.get_articles_by_stage(
+            'title_filtered',
+            columns=('id', 'sector', 'text_zstd'),
+            where="prediction = 'LABEL_1_relevant' AND text_len <= 13000"
+        )
         
         logging.info(f"Processing {len(articles)} articles with content filter")
         
-        for article in tqdm(articles):
-            if len(article['text']) > 13000:
-                continue
-            
-            prompt = self.get_filter_prompt().replace("<domain>", article['sector'])
-            answer = self.llm.run_llama(prompt=prompt, text=article['text'])
-            
-            self.temp_db.update_article(article['id'], {
-                'gpt3_filter_answer': answer,
-                'processing_stage': 'content_filtered'
-            })
+        jobs = [
+            (article['id'], self.prompts[article['sector']], get_text(article))
+            for article in articles
+        ]
         
+        # Articles a batch could not complete stay at this stage for the next run
+        run = self.llm.run_llama_batch if use_batch else self.llm.run_llama_many
+        pending = []
+        for article_id, answer in tqdm(run(jobs), total=len(jobs)):
+            pending.append((answer, article_id))
+            if len(pending) >= UPDATE_FLUSH_SIZE:
+                self.temp_db.update_filter_answers(pending)
+                pending = []
+        
+        self.temp_db.update_filter_answers(pending)
         logging.info("Content filtering complete")
 
 
@@ -89,6 +144,7 @@ class Summarizer:
     def __init__(self, temp_db: TempArticleDB):
         self.temp_db = temp_db
         self.llm = llmRequester()
+        self.prompts = SectorPrompts(self.get_summary_prompt())
     
     def get_summary_prompt(self):
         return '''You goal is to inspire users to be more aware of undesirable consequences of <domain>, using insights from the below input text.
@@ -98,30 +154,38 @@ Extract and summarize any undesirable consequence of the technology from the art
 
 Answer about the undesirable consequence in 1-3 sentences:'''
     
-    def process(self):
-        """Summarize filtered articles"""
-        articles = self.temp_db.get_articles_by_stage('content_filtered')
+    def process(self, use_batch=False):
+        """Summarize filtered articles, optionally through the OpenAI Batch API"""
         # Only process articles that passed content filter
-        articles = [a for a in articles if 'yes' in a['gpt3_filter_answer'].lower()]
+        articles = self.temp_db.get_articles_by_stage(
+            'content_filtered',
+            columns=('id', 'sector', 'text_zstd'),
+            where="gpt3_filter_answer LIKE '%yes%' COLLATE NOCASE AND text_len <= 13000"
+        )
         
         logging.info(f"Processing {len(articles)} articles with summarizer")
         
-        for article in tqdm(articles):
-            if len(article['text']) > 13000:
-                continue
-            
-            prompt = self.get_summary_prompt().replace("<domain>", article['sector'])
-            summary = self.llm.run_llama(prompt=prompt, text=article['text'])
-            
-            # Skip if no consequence found
+        jobs = [
+            (article['id'], self.prompts[article['sector']], get_text(article))
+            for article in articles
+        ]
+        
+        run = self.llm.run_llama_batch if use_batch else self.llm.run_llama_many
+        pending = []
+        rejected = []
+        for article_id, summary in tqdm(run(jobs), total=len(jobs)):
+            # Mark rejected if no consequence found, so later queries skip it by stage
             if "no_consequence" in summary.lower():
+                rejected.append((article_id,))
                 continue
             
-            self.temp_db.update_article(article['id'], {
-                'gpt3_summary': summary,
-                'processing_stage': 'summarized'
-            })
+            pending.append((summary, article_id))
+            if len(pending) >= UPDATE_FLUSH_SIZE:
+                self.temp_db.update_summaries(pending)
+                pending = []
         
+        self.temp_db.update_summaries(pending)
+        self.temp_db.mark_rejected(rejected)
         logging.info("Summarization complete")
 
 
@@ -139,24 +203,28 @@ Summary of the consequence: "{text}"
 
 One Aspect (Please only select one from above):'''
     
-    def process(self):
-        """Classify aspects of summarized articles"""
-        articles = self.temp_db.get_articles_by_stage('summarized')
+    def process(self, use_batch=False):
+        """Classify aspects of summarized articles, optionally through the OpenAI Batch API"""
+        articles = self.temp_db.get_articles_by_stage(
+            'summarized',
+            columns=('id', 'gpt3_summary'),
+            where="text_len <= 19000"
+        )
         
         logging.info(f"Processing {len(articles)} articles with aspect classifier")
         
-        for article in tqdm(articles):
-            if len(article['text']) > 19000:
-                continue
-            
-            aspect = self.llm.run_llama(
-                prompt=self.get_aspect_prompt(),
-                text=article['gpt3_summary']
-            )
-            
-            self.temp_db.update_article(article['id'], {
-                'gpt3_aspect': aspect,
-                'processing_stage': 'classified'
-            })
+        jobs = [
+            (article['id'], self.get_aspect_prompt(), article['gpt3_summary'])
+            for article in articles
+        ]
+        
+        run = self.llm.run_llama_batch if use_batch else self.llm.run_llama_many
+        pending = []
+        for article_id, aspect in tqdm(run(jobs), total=len(jobs)):
+            pending.append((aspect, article_id))
+            if len(pending) >= UPDATE_FLUSH_SIZE:
+                self.temp_db.update_aspects(pending)
+                pending = []
         
+        self.temp_db.update_aspects(pending)
         logging.info("Aspect classification complete")
\ No newline at end of file
@@ -7,13 +7,35 @@ import logging
 import tqdm
 
 
+# Rows per existence check + insert; the URL list travels in the GET query
+# string, so this stays small enough to keep it under proxy URL length limits
+UPLOAD_CHUNK_SIZE = 100
+
+
 class SupabaseUploader:
     def __init__(self, supabase_url: str, supabase_key: str, temp_db: TempArticleDB):
         self.supabase = create_client(supabase_url, supabase_key)
         self.temp_db = temp_db
     
+    def map_row(self, article):
+        """Map a temp DB article to the production schema"""
+        return {
+            'title': article['title'],
+            'text': article['text'],
+            'magazine': article['source'],  # maps to source
+            'url': article['url'],
+            'label': article['sector'],      # maps to sector
+            'date': article.get('published_at'),  # date per website
+            'gpt_summary': article['gpt3_summary'],
+            'sector': article['gpt3_aspect']  # the classified aspect
+        }
+    
     def upload_final_articles(self):
-        """Upload only fully processed articles to Supabase"""
+        """Upload only fully processed articles to Supabase.
+
+        Each chunk costs two requests: one lookup of which URLs already exist
+        in production, then one bulk insert of the rest.
+        """
         articles = self.temp_db.get_final_articles()
         
         logging.info(f"Uploading {len(articles)} final articles to Supabase")
@@ -21,35 +43,26 @@ class SupabaseUploader:
         uploaded = 0
         skipped = 0
         
-        for article in tqdm.tqdm(articles):
+        payload = [self.map_row(article) for article in articles]
+        for start in tqdm.tqdm(range(0, len(payload), UPLOAD_CHUNK_SIZE)):
+            chunk = payload[start:start + UPLOAD_CHUNK_SIZE]
             try:
-                # Check if already exists in production
+                # Check which URLs already exist in production
                 existing = self.supabase.table('data')\
                     .select('url')\
-                    .eq('url', article['url'])\
+                    .in_('url', [row['url'] for row in chunk])\
                     .execute()
+                existing_urls = {row['url'] for row in existing.data or []}
                 
-                if len(existing.data) > 0:
-                    skipped += 1
-                    continue
-                
-                # Map to your production schema
-                data = {
-                    'title': article['title'],
-                    'text': article['text'],
-                    'magazine': article['source'],  # maps to source
-                    'url': article['url'],
-                    'label': article['sector'],      # maps to sector
-                    'date': article.get('published_at'),  # date per website
-                    'gpt_summary': article['gpt3_summary'],
-                    'sector': article['gpt3_aspect']  # the classified aspect
-                }
+                new_rows = [row for row in chunk if row['url'] not in existing_urls]
+                if new_rows:
+                    self.supabase.table('data').insert(new_rows).execute()
                 
-                self.supabase.table('data').insert(data).execute()
-                uploaded += 1
+                uploaded += len(new_rows)
+                skipped += len(chunk) - len(new_rows)
                 
             except Exception as e:
-                logging.error(f"Error uploading article {article['url']}: {e}")
+                logging.error(f"Error uploading articles {start}-{start + len(chunk) - 1}: {e}")
         
         logging.info(f"Upload complete: {uploaded} uploaded, {skipped} skipped (already exist)")
         return uploaded, skipped
\ No newline at end of file
@@ -11,16 +11,27 @@ sys.dont_write_bytecode = True
 
 import os
 import time
+import asyncio
 import logging
 import re
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, urlsplit, urlunsplit
+
+import requests_cache
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
+from selectolax.lexbor import LexborHTMLParser
+from lxml import etree
+import orjson
 from dotenv import load_dotenv
 from supabase import create_client
-from newspaper import Article
-from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
 
 # -------------------------
 # Config
@@ -36,7 +47,68 @@ HEADERS = {
 }
 
 REQUEST_TIMEOUT = 10
-SLEEP_SECONDS = 0.7  # be polite to ACM/arXiv
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ARXIV_API_BATCH = 100  # ids per arXiv API call
+ARXIV_API_DELAY = 3  # seconds between arXiv API calls, per arXiv's guidelines
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+CROSSREF_API_URL = "https://api.crossref.org/works"
+CROSSREF_BATCH = 40  # DOIs per filter query, keeps the URL short
+CROSSREF_MAILTO = "you@example.com"  # identifies us for Crossref's polite pool
+CROSSREF_HEADERS = {"User-Agent": f"AcademicDateBot/1.0 (mailto:{CROSSREF_MAILTO})"}
+MAX_CONCURRENCY_PER_HOST = 4  # in-flight lookups per remote host
+# Requests per second allowed per remote host, as (max_rate, time_period).
+# ACM URLs are resolved through Crossref, so dl.acm.org is never contacted.
+HOST_RATE_LIMITS = {
+    "arxiv.org": (3, 1),
+    "api.crossref.org": (50, 1),  # polite pool, see CROSSREF_HEADERS
+}
+DEFAULT_RATE_LIMIT = (2, 1)
+MAX_WORKERS = 32  # threads running the blocking extractors
+UPDATE_BATCH = 500  # ids per Supabase update request
+
+# One pooled session for every extractor so TLS connections to arXiv,
+# Crossref and article hosts are reused across rows and threads.
+# Responses are cached on disk, so reruns and duplicate URLs skip the network;
+# only 200/404 are stored, so a transient 5xx is retried on the next run.
+# Stale entries are revalidated with ETag/Last-Modified, so an unchanged
+# page comes back as a bodyless 304 instead of a full download.
+SESSION = requests_cache.CachedSession(
+    cache_name="date_cache",
+    backend="sqlite",
+    expire_after=30 * 86400,
+    allowable_codes=(200, 404),
+    cache_control=True,
+)
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+    ),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Patterns and formats used on every row, compiled once
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+_ARXIV_ID_RE = re.compile(r"(\d{4}\.\d{4,5})")
+_ACM_DOI_RE = re.compile(r"/doi/(?:abs/)?(10\.\d{4,9}/[^?#]+)")
+DATE_FORMATS = ("%Y/%m/%d", "%Y-%m-%d")
+
+# Generic pages also need JSON-LD <script> blocks, so only those and <meta>
+# are built into the BeautifulSoup tree. arXiv and ACM use selectolax instead.
+META_SCRIPT_STRAINER = SoupStrainer(["meta", "script"])
+
+# ACM citation tags that carry a full date, most reliable first
+ACM_DATE_METAS = (
+    "citation_publication_date",
+    "citation_online_date",
+    "citation_cover_date",
+    "citation_conference_date",
+)
 
 
 # -------------------------
@@ -47,7 +119,7 @@ def parse_date(date_str: str):
     """
     Parse common citation date formats into YYYY-MM-DD.
     """
-    for fmt in ("%Y/%m/%d", "%Y-%m-%d"):
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt).strftime("%Y-%m-%d")
         except ValueError:
@@ -65,12 +137,53 @@ def normalize_arxiv_url(url: str) -> str:
     - remove version suffixes
     - convert /pdf/ links to /abs/
     """
-    url = re.sub(r"v\d+$", "", url)
     if "/pdf/" in url:
         url = url.replace("/pdf/", "/abs/").replace(".pdf", "")
+    url = _ARXIV_VERSION_RE.sub("", url)
     return url
 
 
+def extract_arxiv_id(url: str):
+    match = _ARXIV_ID_RE.search(url)
+    return match.group(1) if match else None
+
+
+def extract_arxiv_dates_bulk(urls):
+    """
+    Resolve first-submission dates for many arXiv URLs through the arXiv API,
+    which accepts a comma-separated id_list and returns a small Atom feed.
+    Returns {arxiv_id: YYYY-MM-DD}; ids it cannot resolve are left out.
+    """
+    ids = sorted({arxiv_id for arxiv_id in map(extract_arxiv_id, urls) if arxiv_id})
+    dates = {}
+
+    for start in range(0, len(ids), ARXIV_API_BATCH):
+        chunk = ids[start:start + ARXIV_API_BATCH]
+        try:
+            r = SESSION.get(
+                ARXIV_API_URL,
+                params={"id_list": ",".join(chunk), "max_results": len(chunk)},
+                timeout=REQUEST_TIMEOUT,
+            )
+            r.raise_for_status()
+
+            root = etree.fromstring(r.content)
+            for entry in root.iter(f"{ATOM_NS}entry"):
+                arxiv_id = extract_arxiv_id(entry.findtext(f"{ATOM_NS}id") or "")
+                published = entry.findtext(f"{ATOM_NS}published") or ""
+                date_str = parse_date(published[:10])
+                if arxiv_id and date_str:
+                    dates[arxiv_id] = date_str
+
+        except Exception as e:
+            logging.debug("arXiv bulk lookup failed for %d ids: %s", len(chunk), e)
+
+        if start + ARXIV_API_BATCH < len(ids):
+            time.sleep(ARXIV_API_DELAY)
+
+    return dates
+
+
 def extract_arxiv_date(url: str):
     """
     arXiv exposes reliable citation meta tags.
@@ -78,21 +191,21 @@ def extract_arxiv_date(url: str):
     """
     try:
         url = normalize_arxiv_url(url)
-        r = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+        r = SESSION.get(url, timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
 
-        soup = BeautifulSoup(r.text, "html.parser")
+        tree = LexborHTMLParser(r.content)
 
         meta = (
-            soup.find("meta", {"name": "citation_date"})
-            or soup.find("meta", {"name": "citation_publication_date"})
+            tree.css_first('meta[name="citation_date"]')
+            or tree.css_first('meta[name="citation_publication_date"]')
         )
 
-        if meta and meta.get("content"):
-            return parse_date(meta["content"])
+        if meta and meta.attributes.get("content"):
+            return parse_date(meta.attributes["content"])
 
     except Exception as e:
-        logging.debug(f"arXiv date failed for {url}: {e}")
+        logging.debug("arXiv date failed for %s: %s", url, e)
 
     return None
 
@@ -105,57 +218,55 @@ def extract_acm_date(url: str):
     """
     Robust ACM DL date extraction.
     Handles citation meta tags, OpenGraph, and split year/month fields.
+    Not used by get_date_from_url, which resolves ACM DOIs through Crossref;
+    kept for scraping a single ACM page directly.
     """
     try:
         headers = {
-            **HEADERS,
             "Accept": "text/html,application/xhtml+xml",
             "Accept-Language": "en-US,en;q=0.9",
         }
 
-        r = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        r = SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
 
-        soup = BeautifulSoup(r.text, "html.parser")
+        tree = LexborHTMLParser(r.content)
+
+        # All citation_* tags in one pass, looked up by name below
+        metas = {
+            m.attributes.get("name"): m.attributes.get("content")
+            for m in tree.css('meta[name^="citation_"]')
+        }
 
         # 1. Common ACM citation tags (most reliable)
-        meta_names = [
-            "citation_publication_date",
-            "citation_online_date",
-            "citation_cover_date",
-            "citation_conference_date",
-        ]
-
-        for name in meta_names:
-            meta = soup.find("meta", {"name": name})
-            if meta and meta.get("content"):
-                parsed = parse_date(meta["content"])
+        for name in ACM_DATE_METAS:
+            content = metas.get(name)
+            if content:
+                parsed = parse_date(content)
                 if parsed:
                     return parsed
 
         # 2. OpenGraph published time
-        og = soup.find("meta", {"property": "article:published_time"})
-        if og and og.get("content"):
+        og = tree.css_first('meta[property="article:published_time"]')
+        if og and og.attributes.get("content"):
             try:
-                dt = datetime.fromisoformat(og["content"].replace("Z", ""))
+                dt = datetime.fromisoformat(og.attributes["content"].replace("Z", ""))
                 return dt.strftime("%Y-%m-%d")
             except ValueError:
                 pass
 
         # 3. Split year/month fallback
-        year_meta = soup.find("meta", {"name": "citation_year"})
-        month_meta = soup.find("meta", {"name": "citation_month"})
+        year = metas.get("citation_year")
+        month = metas.get("citation_month")
 
-        if year_meta and month_meta:
+        if year and month:
             try:
-                year = int(year_meta["content"])
-                month = int(month_meta["content"])
-                return datetime(year, month, 1).strftime("%Y-%m-%d")
+                return datetime(int(year), int(month), 1).strftime("%Y-%m-%d")
             except ValueError:
                 pass
 
     except Exception as e:
-        logging.debug(f"ACM date failed for {url}: {e}")
+        logging.debug("ACM date failed for %s: %s", url, e)
 
     return None
 
@@ -165,68 +276,186 @@ def extract_acm_date(url: str):
 # Generic fallback
 # -------------------------
 
+# (attribute, value) pairs for <meta> publication dates, most reliable first
+GENERIC_DATE_META = (
+    ("property", "article:published_time"),
+    ("name", "citation_publication_date"),
+    ("name", "citation_date"),
+    ("name", "DC.date.issued"),
+    ("name", "DC.date"),
+    ("name", "dc.date"),
+    ("itemprop", "datePublished"),
+)
+
+
+def parse_any_date(value: str):
+    """
+    Parse a citation-style or ISO 8601 date string into YYYY-MM-DD.
+    """
+    value = value.strip()
+    parsed = parse_date(value)
+    if parsed:
+        return parsed
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%Y-%m-%d")
+    except ValueError:
+        return parse_date(value[:10])
+
+
+def find_date_published(data):
+    """
+    Walk decoded JSON-LD (objects, lists, @graph) for the first datePublished.
+    """
+    if isinstance(data, dict):
+        if isinstance(data.get("datePublished"), str):
+            return data["datePublished"]
+        children = data.values()
+    elif isinstance(data, list):
+        children = data
+    else:
+        return None
+
+    for child in children:
+        found = find_date_published(child)
+        if found:
+            return found
+    return None
+
+
+def extract_meta_date(html_bytes: bytes):
+    """
+    Read a publication date from <meta> tags, falling back to JSON-LD
+    datePublished. Only <meta> and <script> elements are parsed.
+    """
+    soup = BeautifulSoup(html_bytes, "lxml", parse_only=META_SCRIPT_STRAINER)
+
+    metas = {}
+    for meta in soup.find_all("meta"):
+        content = meta.get("content")
+        if not content:
+            continue
+        for attr in ("property", "name", "itemprop"):
+            if meta.get(attr):
+                metas.setdefault((attr, meta[attr]), content)
+
+    for key in GENERIC_DATE_META:
+        if key in metas:
+            parsed = parse_any_date(metas[key])
+            if parsed:
+                return parsed
+
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            found = find_date_published(orjson.loads(script.get_text()))
+        except orjson.JSONDecodeError:
+            continue
+        if found:
+            parsed = parse_any_date(found)
+            if parsed:
+                return parsed
+
+    return None
+
+
 def extract_generic_date(url: str):
     """
-    Fallback for non-academic pages using newspaper3k.
+    Fallback for non-academic pages: scan the page's metadata for a
+    publication date. The page is fetched through SESSION so the
+    connection pool is reused.
     """
     try:
-        article = Article(url)
-        article.download()
-        article.parse()
+        r = SESSION.get(url, timeout=REQUEST_TIMEOUT)
+        r.raise_for_status()
 
-        if article.publish_date:
-            return article.publish_date.strftime("%Y-%m-%d")
+        return extract_meta_date(r.content)
 
     except Exception as e:
-        logging.debug(f"Generic date failed for {url}: {e}")
+        logging.debug("Generic date failed for %s: %s", url, e)
 
     return None
 
 
+def crossref_date(data):
+    """
+    Pick the publication date from a Crossref work record.
+    Prefers published-print → published-online → issued.
+    """
+    date_fields = [
+        "published-print",
+        "published-online",
+        "issued",
+    ]
+
+    for field in date_fields:
+        if field in data and "date-parts" in data[field]:
+            parts = data[field]["date-parts"][0]
+            year = parts[0]
+            month = parts[1] if len(parts) > 1 else 1
+            day = parts[2] if len(parts) > 2 else 1
+            return datetime(year, month, day).strftime("%Y-%m-%d")
+
+    return None
+
 
 def extract_crossref_date_from_doi(doi: str):
     """
     Fetch publication date from Crossref.
     Prefers published-print → published-online → issued.
+    Goes through the filtered list query: select= is only honored on list
+    queries, and the single-work endpoint returns the full record
+    (references, authors, funders) just to read three date fields.
     """
-    try:
-        r = requests.get(
-            f"https://api.crossref.org/works/{doi}",
-            headers={"User-Agent": "AcademicDateBot/1.0 (mailto:you@example.com)"},
-            timeout=10,
-        )
-        r.raise_for_status()
+    return extract_crossref_dates_bulk([doi]).get(doi.lower())
 
-        data = r.json()["message"]
 
-        date_fields = [
-            "published-print",
-            "published-online",
-            "issued",
-        ]
+def extract_crossref_dates_bulk(dois):
+    """
+    Fetch publication dates for many DOIs with Crossref's doi: filter,
+    asking only for the date fields. Returns {lowercased doi: YYYY-MM-DD}.
+    """
+    dois = sorted({doi.lower() for doi in dois if doi})
+    dates = {}
 
-        for field in date_fields:
-            if field in data and "date-parts" in data[field]:
-                parts = data[field]["date-parts"][0]
-                year = parts[0]
-                month = parts[1] if len(parts) > 1 else 1
-                day = parts[2] if len(parts) > 2 else 1
-                return datetime(year, month, day).strftime("%Y-%m-%d")
+    for start in range(0, len(dois), CROSSREF_BATCH):
+        chunk = dois[start:start + CROSSREF_BATCH]
+        try:
+            r = SESSION.get(
+                CROSSREF_API_URL,
+                params={
+                    "filter": ",".join(f"doi:{doi}" for doi in chunk),
+                    "select": "DOI,published-print,published-online,issued",
+                    "rows": 1000,
+                    "mailto": CROSSREF_MAILTO,
+                },
+                headers=CROSSREF_HEADERS,
+                timeout=REQUEST_TIMEOUT,
+            )
+            r.raise_for_status()
+
+            for item in orjson.loads(r.content)["message"]["items"]:
+                try:
+                    date_str = crossref_date(item)
+                except Exception as e:
+                    logging.debug("Crossref date unreadable for DOI %s: %s", item.get("DOI"), e)
+                    continue
+                if date_str:
+                    dates[item["DOI"].lower()] = date_str
 
-    except Exception as e:
-        logging.debug(f"Crossref failed for DOI {doi}: {e}")
+        except Exception as e:
+            logging.debug("Crossref bulk lookup failed for %d DOIs: %s", len(chunk), e)
 
-    return None
+    return dates
 
 
 def extract_doi_from_acm_url(url: str):
-    match = re.search(r"/doi/(?:abs/)?(10\.\d{4,9}/[^?#]+)", url)
+    match = _ACM_DOI_RE.search(url)
     return match.group(1) if match else None
 
 # -------------------------
 # Dispatcher
 # -------------------------
 
+@lru_cache(maxsize=100_000)
 def get_date_from_url(url: str):
     if not url:
         return None
@@ -236,15 +465,113 @@ def get_date_from_url(url: str):
 
     if "dl.acm.org" in url:
         doi = extract_doi_from_acm_url(url)
-        print("doi " + doi)
-        if doi:
-            print("OHTHTHR " + extract_crossref_date_from_doi(doi))
-            return extract_crossref_date_from_doi(doi)
-        return None
+        if not doi:
+            return None
+        date = extract_crossref_date_from_doi(doi)
+        logging.debug("crossref date for %s: %s", doi, date)
+        return date
 
     return extract_generic_date(url)
 
 
+def normalize_key(url: str):
+    """
+    Grouping key so trivial URL variations share one lookup: lowercased
+    scheme/host, no fragment, and for arXiv/ACM no query string or arXiv
+    version suffix. Other sites keep their query, which may identify the page.
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    query = "" if ("arxiv.org" in host or "dl.acm.org" in host) else parts.query
+    key = urlunsplit((parts.scheme.lower(), host, parts.path, query, ""))
+
+    if "arxiv.org" in host:
+        key = normalize_arxiv_url(key)
+    return key
+
+
+def request_host(url: str):
+    """
+    Host that get_date_from_url actually contacts for this URL.
+    ACM pages are resolved through Crossref, not dl.acm.org.
+    """
+    if "arxiv.org" in url:
+        return "arxiv.org"
+    if "dl.acm.org" in url:
+        return "api.crossref.org"
+    return urlparse(url).netloc.lower()
+
+
+def prefetch_dates(urls):
+    """
+    Resolve whatever can be looked up in bulk before per-URL scraping.
+    Returns {url: YYYY-MM-DD} for the URLs it resolved.
+    """
+    arxiv_urls = [url for url in urls if url and "arxiv.org" in url]
+    arxiv_dates = extract_arxiv_dates_bulk(arxiv_urls)
+
+    acm_dois = {
+        url: extract_doi_from_acm_url(url)
+        for url in urls
+        if url and "dl.acm.org" in url
+    }
+    doi_dates = extract_crossref_dates_bulk(acm_dois.values())
+
+    known = {}
+    for url in arxiv_urls:
+        date_str = arxiv_dates.get(extract_arxiv_id(url))
+        if date_str:
+            known[url] = date_str
+    for url, doi in acm_dois.items():
+        date_str = doi_dates.get(doi.lower()) if doi else None
+        if date_str:
+            known[url] = date_str
+    return known
+
+
+def host_limiter(host: str):
+    """Token bucket for one host, so busy hosts never hold up the others."""
+    return AsyncLimiter(*HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+
+
+async def fetch_date(url: str, host_semaphores, host_limiters, known):
+    """
+    Use a bulk-prefetched date if there is one; otherwise run the blocking
+    extractor in a worker thread while holding a slot for the target host.
+    The host's token bucket keeps per-host pacing polite.
+    """
+    if url in known:
+        return known[url]
+
+    host = request_host(url or "")
+    async with host_semaphores[host], host_limiters[host]:
+        try:
+            return await asyncio.to_thread(get_date_from_url, url)
+        except Exception as e:
+            logging.debug("Date lookup failed for %s: %s", url, e)
+            return None
+
+
+async def fetch_dates(urls, host_limiters):
+    """
+    Look up dates for many URLs concurrently, bounded per host.
+    host_limiters is shared across calls so pacing carries over between pages.
+    Returns dates in the same order as urls.
+    """
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=MAX_WORKERS))
+    host_semaphores = defaultdict(lambda: asyncio.Semaphore(MAX_CONCURRENCY_PER_HOST))
+    for host in {request_host(url or "") for url in urls} - host_limiters.keys():
+        host_limiters[host] = host_limiter(host)
+    known = await asyncio.to_thread(prefetch_dates, urls)
+    return await tqdm_asyncio.gather(
+        *(fetch_date(url, host_semaphores, host_limiters, known) for url in urls),
+        desc="Backfilling dates",
+    )
+
+
 # -------------------------
 # Main
 # -------------------------
@@ -262,12 +589,20 @@ def main():
 
     logging.info("Fetching rows without dates...")
 
+    # Keyset pagination over id: each NULL-date row is visited once, even if
+    # its lookup or update fails and it stays NULL
+    last_id = 0
+    # One token bucket per host for the whole run, not per page
+    host_limiters = {}
+
     while True:
         result = (
             client
             .table("data")
-            .select("title, url, date")
+            .select("id, url")
             .is_("date", "null")
+            .gt("id", last_id)
+            .order("id")
             .limit(1000)
             .execute()
         )
@@ -277,31 +612,44 @@ def main():
             logging.info("No rows left to backfill.")
             break
 
+        last_id = rows[-1]["id"]
+
         updated = 0
         failed = 0
 
-        for row in tqdm(rows, desc="Backfilling dates"):
-            row_title = row["title"]
-            url = row["url"]
-
-            date_str = get_date_from_url(url)
+        # Rows pointing at the same paper/page are looked up once
+        groups = defaultdict(list)
+        for row in rows:
+            groups[normalize_key(row["url"])].append(row)
+
+        keys = list(groups)
+        dates = asyncio.run(fetch_dates([groups[key][0]["url"] for key in keys], host_limiters))
+        date_map = dict(zip(keys, dates))
+
+        # Rows that resolved to the same date share one UPDATE ... WHERE id IN (...)
+        ids_by_date = defaultdict(list)
+        for key, group_rows in groups.items():
+            date_str = date_map[key]
+            for row in group_rows:
+                if date_str:
+                    ids_by_date[date_str].append(row["id"])
+                else:
+                    failed += 1
 
-            if date_str:
+        for date_str, ids in ids_by_date.items():
+            pending = iter(ids)
+            while batch := list(islice(pending, UPDATE_BATCH)):
                 try:
                     client.table("data") \
                         .update({"date": date_str}) \
-                        .eq("title", row_title) \
+                        .in_("id", batch) \
                         .execute()
-                    updated += 1
+                    updated += len(batch)
                 except Exception as e:
-                    logging.error(f"Supabase update failed (title={row_title}): {e}")
-                    failed += 1
-            else:
-                failed += 1
-
-            time.sleep(SLEEP_SECONDS)
+                    logging.error("Supabase update failed (%d rows): %s", len(batch), e)
+                    failed += len(batch)
 
-        logging.info(f"Batch complete. Updated={updated}, Failed={failed}")
+        logging.info("Batch complete. Updated=%d, Failed=%d", updated, failed)
 
     logging.info("Backfill finished.")
 
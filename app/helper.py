@@ -1,18 +1,49 @@
 import os
-import json
+import orjson
 import logging
+import threading
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from openai import OpenAI
 
 load_dotenv()
 
+# Shared by every llmRequester so all pipeline stages draw from one pool.
+LLM_MAX_WORKERS = 16
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+# Caps in-flight requests; lower GPT_MAX_CONCURRENCY to stay under the account's rate limit
+LLM_SEMAPHORE = threading.Semaphore(int(os.getenv("GPT_MAX_CONCURRENCY", LLM_MAX_WORKERS)))
+
+# Seconds between status checks while waiting on a Batch API job
+BATCH_POLL_SECONDS = 30
+
+# One OpenAI client per process; its HTTP/2 pool is shared by every llmRequester and thread
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client(api_key):
+    """Return the shared OpenAI client, creating it on first use"""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = OpenAI(
+                api_key=api_key,
+                http_client=httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                ),
+            )
+        return _CLIENT
+
 class llmRequester:
     def __init__(self):
         self.api_key = os.getenv("GPT_KEY")
         if not self.api_key:
             raise ValueError("GPT_KEY not found in .env file")
 
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_client(self.api_key)
 
         # Defaults (override via setters if you want)
         self.model = "gpt-4o-mini"
@@ -56,6 +87,121 @@ class llmRequester:
             logging.error(f"Error calling OpenAI API in chat(): {e}")
             raise
 
+    def _submit(self, fn, *args, **kwargs):
+        """Schedule fn on the shared LLM pool, holding a rate-limit slot while it runs"""
+        def limited():
+            with LLM_SEMAPHORE:
+                return fn(*args, **kwargs)
+        return LLM_EXECUTOR.submit(limited)
+
+    def chat_batch(self, messages_list, response_format=None, **kwargs):
+        """
+        Run chat() over many independent message lists concurrently.
+
+        Requests are network-bound, so overlapping them amortizes latency.
+        Results are returned in the same order as messages_list.
+        """
+        futures = [
+            self._submit(self.chat, messages, response_format=response_format, **kwargs)
+            for messages in messages_list
+        ]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            # Don't keep spending API calls on results nobody will read
+            for future in futures:
+                future.cancel()
+            raise
+
+    def run_llama_many(self, jobs):
+        """
+        Run run_llama() concurrently over (key, prompt, text) jobs.
+        Yields (key, answer) pairs in completion order.
+        """
+        futures = {self._submit(self.run_llama, prompt, text): key for key, prompt, text in jobs}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        except BaseException:
+            # Also reached if the consumer stops early (GeneratorExit)
+            for future in futures:
+                future.cancel()
+            raise
+
+    def run_batch(self, messages_list, response_format=None, model=None, temperature=None, max_tokens=None):
+        """
+        Run chat() requests through the OpenAI Batch API, for offline jobs.
+
+        Half the cost of chat() and no per-request rate limiting, but results can
+        take up to 24h. Returns results in the same order as messages_list, with
+        None for any request the batch could not complete.
+        """
+        if not messages_list:
+            return []
+
+        body = dict(
+            model=model or self.model,
+            temperature=self.temperature if temperature is None else temperature,
+            max_tokens=self.max_tokens if max_tokens is None else max_tokens,
+        )
+        if response_format is not None:
+            body["response_format"] = response_format
+
+        lines = [
+            orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {**body, "messages": messages},
+            })
+            for i, messages in enumerate(messages_list)
+        ]
+        input_file = self.client.files.create(file=("batch.jsonl", b"\n".join(lines)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logging.info(f"Submitted batch {batch.id} with {len(messages_list)} requests")
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(BATCH_POLL_SECONDS)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+
+        results = [None] * len(messages_list)
+        if not batch.output_file_id:
+            logging.error(f"Batch {batch.id} produced no output")
+            return results
+
+        for line in self.client.files.content(batch.output_file_id).read().splitlines():
+            item = orjson.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") != 200:
+                logging.error(f"Batch request {item['custom_id']} failed: {item.get('error') or response}")
+                continue
+
+            content = (response["body"]["choices"][0]["message"]["content"] or "").strip()
+            try:
+                results[int(item["custom_id"])] = self._safe_json_loads(content) if response_format is not None else content
+            except orjson.JSONDecodeError:
+                continue
+
+        return results
+
+    def run_llama_batch(self, jobs):
+        """
+        Batch API counterpart of run_llama_many over (key, prompt, text) jobs.
+        Yields (key, answer) pairs in job order, skipping requests the batch could not complete.
+        """
+        jobs = list(jobs)
+        answers = self.run_batch([self.llama_messages(prompt, text) for _, prompt, text in jobs])
+        for (key, _, _), answer in zip(jobs, answers):
+            if answer is not None:
+                yield key, answer
+
     def _safe_json_loads(self, s: str):
         """
         Parse JSON content robustly. Handles occasional code-fences.
@@ -71,28 +217,30 @@ class llmRequester:
             s = s.strip()
 
         try:
-            return json.loads(s)
-        except json.JSONDecodeError as e:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as e:
             logging.error(f"Failed to parse JSON. Raw content was:\n{s}")
             raise
 
     # ---------- Existing interface you already use ----------
+    def llama_messages(self, prompt: str, text: str):
+        """Messages run_llama sends: fixed system prompt, then prompt with {text} filled in"""
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful assistant that analyzes articles about technology and its societal impacts."
+            },
+            {"role": "user", "content": prompt.replace("{text}", text)}
+        ]
+
     def run_llama(self, prompt: str, text: str) -> str:
         """
         Keeps your old interface: fills {text} and returns plain string answer.
         """
-        full_prompt = prompt.replace("{text}", text)
-
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that analyzes articles about technology and its societal impacts."
-                    },
-                    {"role": "user", "content": full_prompt}
-                ],
+                messages=self.llama_messages(prompt, text),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
@@ -22,6 +22,26 @@ def main(supabase_url, supabase_key, model_path):
     fetcher = ArticleRequester(temp_db)
     fetcher.fetch_all_sources()
     
+    # Step 2: Title classification, offline through the Batch API
+    logging.info("=== Step 2: Title Classification (batch) ===")
+    title_classifier = TitleClassifier(temp_db)
+    title_classifier.process(use_batch=True)
+    
+    # Step 3: Content filtering
+    logging.info("=== Step 3: Content Filtering (batch) ===")
+    content_filter = ContentFilter(temp_db)
+    content_filter.process(use_batch=True)
+    
+    # Step 4: Summarization
+    logging.info("=== Step 4: Summarization (batch) ===")
+    summarizer = Summarizer(temp_db)
+    summarizer.process(use_batch=True)
+    
+    # Step 5: Aspect classification
+    logging.info("=== Step 5: Aspect Classification (batch) ===")
+    aspect_classifier = AspectClassifier(temp_db)
+    aspect_classifier.process(use_batch=True)
+    
 
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 import os
 import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -10,43 +13,68 @@ SUPABASE_URL = os.getenv('REACT_APP_URL') # e.g., https://abcdefgh.supabase.co
 SUPABASE_KEY = os.getenv('REACT_APP_KEY')  # Your anon/service key
 TABLE_NAME = "data"  # Change if your table has a different name
 CSV_FILE_PATH = "./src/dataset/dataset.csv"  # Path to your CSV file
+BATCH_SIZE = 500  # Rows per insert request
+MAX_WORKERS = 8  # Concurrent insert requests
 
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+def insert_chunk(start, chunk):
+    """Insert one chunk of rows. If the bulk insert fails, retry row by row
+    so the failing rows are reported. Returns (success_count, error_count)."""
+    end = start + len(chunk)
+    try:
+        supabase.table(TABLE_NAME).insert(chunk).execute()
+        print(f"✓ Uploaded rows {start + 1}-{end}")
+        return len(chunk), 0
+    except Exception as e:
+        print(f"✗ Bulk insert failed for rows {start + 1}-{end}, retrying row by row: {str(e)}")
+    
+    success_count = 0
+    error_count = 0
+    for i, row in enumerate(chunk, start + 1):
+        try:
+            supabase.table(TABLE_NAME).insert(row).execute()
+            success_count += 1
+        except Exception as e:
+            print(f"✗ Error with row {i}: {str(e)}")
+            error_count += 1
+    return success_count, error_count
+
+def chunks(rows, n):
+    """Yield successive lists of up to n rows without reading ahead"""
+    while chunk := list(islice(rows, n)):
+        yield chunk
+
 def upload_csv_file():
     try:
-        # Read CSV file
-        with open(CSV_FILE_PATH, 'r', encoding='utf-8') as f:
-            csv_reader = csv.DictReader(f)
-            rows = list(csv_reader)
-        
-        print(f"Found {len(rows)} rows in CSV")
         print(f"Supabase URL: {SUPABASE_URL}")
         
         success_count = 0
         error_count = 0
         
-        # Option 1: Insert all rows at once (faster, but fails if any row has issues)
-        # try:
-        #     result = supabase.table(TABLE_NAME).insert(rows).execute()
-        #     print(f"✓ Uploaded all {len(rows)} rows")
-        #     success_count = len(rows)
-        # except Exception as e:
-        #     print(f"✗ Bulk insert failed: {str(e)}")
-        #     error_count = len(rows)
-        
-        # Option 2: Insert rows one by one (slower, but shows which rows fail)
-        for i, row in enumerate(rows, 1):
-            try:
-                result = supabase.table(TABLE_NAME).insert(row).execute()
-                print(f"✓ Uploaded row {i}/{len(rows)}")
-                success_count += 1
-            except Exception as e:
-                print(f"✗ Error with row {i}: {str(e)}")
-                error_count += 1
+        # Insert in chunks as they are parsed, several requests in flight at once;
+        # the client's HTTP connection pool is shared by the worker threads.
+        # At most 2 * MAX_WORKERS chunks are held in memory at a time.
+        with open(CSV_FILE_PATH, 'r', encoding='utf-8') as f, \
+                ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            csv_reader = csv.DictReader(f)
+            in_flight = deque()
+            rows_read = 0
+            for chunk in chunks(csv_reader, BATCH_SIZE):
+                in_flight.append(pool.submit(insert_chunk, rows_read, chunk))
+                rows_read += len(chunk)
+                if len(in_flight) >= 2 * MAX_WORKERS:
+                    chunk_success, chunk_errors = in_flight.popleft().result()
+                    success_count += chunk_success
+                    error_count += chunk_errors
+            for future in in_flight:
+                chunk_success, chunk_errors = future.result()
+                success_count += chunk_success
+                error_count += chunk_errors
         
         print(f"\n--- Summary ---")
+        print(f"Rows read from CSV: {rows_read}")
         print(f"Successful: {success_count}")
         print(f"Errors: {error_count}")
         